@@ -1,8 +1,205 @@
 import argparse
+import atexit
+import json
+import socket
+import sys
+import time
+from functools import lru_cache
 from pymodbus.client import ModbusTcpClient
-from device import DeviceModel
+from device import DeviceModel, decode_power_kw, encode_power_kw
 
-def main():
+# Below this many registers the compiled/vectorized path is not worth the call
+BULK_DECODE_MIN = 16
+
+# NumPy module once imported, False if unavailable, None until first bulk decode
+_np = None
+
+
+def _numpy():
+    """Import NumPy on first use (optional: vectorized decode for large --count)."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = False
+    return _np or None
+
+# decoder -> (printf format, unit)
+DECODE_FORMATS = {
+    "power": ("%.1f", "kW"),
+    "soc": ("%.0f", "%"),
+    "capacity": ("%.1f", "kWh"),
+    "raw": ("%d", ""),
+}
+
+
+def decode_registers(registers, decode: str):
+    """Decode a block of u16 registers; NumPy for blocks of BULK_DECODE_MIN or more."""
+    np = _numpy() if len(registers) >= BULK_DECODE_MIN else None
+    if np is not None:
+        regs = np.asarray(registers, dtype=np.uint16)
+        if decode == "power":
+            # Imported on demand: loading Numba/LLVM costs more than a small read
+            from device_numba import decode_power_kw_arr
+            return decode_power_kw_arr(regs)
+        if decode == "capacity":
+            return regs.astype(np.float32) * np.float32(0.1)
+        if decode == "soc":
+            return regs.astype(np.float32)
+        return regs
+
+    if decode == "power":
+        return [DeviceModel.decode_power_kw(r) for r in registers]
+    if decode == "soc":
+        return [DeviceModel.decode_soc(r) for r in registers]
+    if decode == "capacity":
+        return [DeviceModel.decode_capacity_kwh(r) for r in registers]
+    return list(registers)
+
+
+class TunedModbusTcpClient(ModbusTcpClient):
+    """ModbusTcpClient that tunes every socket it opens, including auto-reconnects."""
+
+    def connect(self):
+        ok = super().connect()
+        if ok:
+            _tune_socket(self.socket)
+        return ok
+
+
+# Connected clients keyed by (host, port), reused across run_once() calls
+_clients = {}
+
+
+def get_client(host: str, port: int) -> ModbusTcpClient:
+    """Return a connected client for (host, port), reusing a cached one."""
+    client = _clients.get((host, port))
+    if client is None:
+        client = _clients[(host, port)] = TunedModbusTcpClient(host, port=port)
+    if not client.connected and not client.connect():
+        raise RuntimeError("Cannot connect to server")
+    return client
+
+
+def close_clients() -> None:
+    """Close and forget every cached client (also run at interpreter exit)."""
+    while _clients:
+        _, client = _clients.popitem()
+        client.close()
+
+
+atexit.register(close_clients)
+
+
+def _tune_socket(sock) -> None:
+    """Disable Nagle for small request/response frames and enable keepalive."""
+    if sock is None:
+        return
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+
+def write_power(client: ModbusTcpClient, addr: int, kw: float, device_id: int) -> float:
+    """FC06 write of a power setpoint (kW) to HR at addr; returns the kW actually written."""
+    value_u16 = encode_power_kw(kw)
+    wr = client.write_register(addr, value_u16, device_id=device_id)
+    if wr.isError():
+        raise RuntimeError(f"Write HR{addr} failed: {wr}")
+    return decode_power_kw(value_u16)
+
+
+def read_registers(client: ModbusTcpClient, area: str, addr: int, count: int, device_id: int):
+    """Read count registers from IR/HR; returns (area_label, registers)."""
+    if area == "ir":
+        rr = client.read_input_registers(addr, count=count, device_id=device_id)
+        area_label = "IR"
+    else:
+        rr = client.read_holding_registers(addr, count=count, device_id=device_id)
+        area_label = "HR"
+
+    if rr.isError():
+        raise RuntimeError(f"Read {area_label} failed: {rr}")
+    return area_label, rr.registers
+
+
+def run_once(client: ModbusTcpClient, args) -> None:
+    """Optional FC06 write, then one register read + decode, on an open client."""
+    if args.set_kw is not None:
+        written_kw = write_power(client, args.addr, args.set_kw, args.device_id)
+        print(f"Wrote HR{args.addr} = {written_kw:.1f} kW (device_id={args.device_id})")
+
+    area_label, registers = read_registers(client, args.area, args.addr, args.count, args.device_id)
+    values = decode_registers(registers, args.decode)
+    fmt, unit = DECODE_FORMATS[args.decode]
+
+    if args.decode_only:
+        if isinstance(values, list):
+            for val in values:
+                print(fmt % val)
+        else:
+            _numpy().savetxt(sys.stdout, values, fmt=fmt)
+        return
+
+    print(f"Read {area_label} (device_id={args.device_id}, addr={args.addr}, count={args.count}):")
+    for i, (reg_u16, val) in enumerate(zip(registers, values)):
+        addr = args.addr + i
+        val_str = f"{fmt % val} {unit}" if unit else str(reg_u16)
+        print(f"  {area_label}{addr} = {val_str} (raw={reg_u16})")
+
+
+def handle_command(client: ModbusTcpClient, cmd: dict, args) -> dict:
+    """Run one --server command; missing fields default to the CLI args."""
+    if not isinstance(cmd, dict):
+        raise ValueError("command must be a JSON object")
+    op = cmd.get("op")
+    addr = int(cmd.get("addr", args.addr))
+    device_id = int(cmd.get("device_id", args.device_id))
+
+    if op == "write":
+        if "kw" not in cmd:
+            raise ValueError("write needs 'kw'")
+        kw = write_power(client, addr, float(cmd["kw"]), device_id)
+        return {"ok": True, "op": op, "addr": addr, "kw": round(kw, 1)}
+
+    if op == "read":
+        area = cmd.get("area", args.area)
+        decode = cmd.get("decode", args.decode)
+        if area not in ("hr", "ir") or decode not in DECODE_FORMATS:
+            raise ValueError(f"bad area/decode: {area!r}/{decode!r}")
+        count = int(cmd.get("count", args.count))
+        _, registers = read_registers(client, area, addr, count, device_id)
+        fmt, unit = DECODE_FORMATS[decode]
+        if unit:
+            # Round to the decoder's display precision (e.g. 0.1 kW)
+            values = [float(fmt % v) for v in decode_registers(registers, decode)]
+        else:
+            values = list(registers)
+        return {"ok": True, "op": op, "area": area, "addr": addr,
+                "registers": list(registers), "values": values}
+
+    raise ValueError(f"unknown op: {op!r}")
+
+
+def serve(client: ModbusTcpClient, args, stdin=None, stdout=None) -> None:
+    """Line-delimited JSON commands on stdin -> one JSON response per line."""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            reply = handle_command(client, json.loads(line), args)
+        except Exception as exc:
+            reply = {"ok": False, "error": str(exc)}
+        stdout.write(json.dumps(reply) + "\n")
+        stdout.flush()
+
+
+@lru_cache(maxsize=1)
+def build_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser()
     ap.add_argument("--host", default="127.0.0.1")
     ap.add_argument("--port", type=int, default=15020)
@@ -13,45 +210,44 @@ def main():
     ap.add_argument("--set-kw", type=float, default=None, help="FC06 write power (kW) to HR at --addr")
     ap.add_argument("--decode", choices=["power", "soc", "capacity", "raw"], default="power",
                     help="Decoder: power (kW signed), soc (%% unsigned), capacity (kWh sc=0.1), raw")
-    args = ap.parse_args()
+    ap.add_argument("--decode-only", action="store_true",
+                    help="Print only the decoded values, one per line")
+    ap.add_argument("--repeat", type=int, default=1, help="Run the write/read cycle N times on one connection")
+    ap.add_argument("--interval", type=float, default=0.0, help="Seconds to sleep between repeats")
+    ap.add_argument("--server", action="store_true",
+                    help='Keep running and serve JSON-line commands from stdin, e.g. {"op":"read","addr":0,"count":2}')
+    return ap
 
-    client = ModbusTcpClient(args.host, port=args.port)
-    if not client.connect():
-        raise RuntimeError("Cannot connect to server")
 
-    try:
-        if args.set_kw is not None:
-            value_u16 = DeviceModel.encode_power_kw(args.set_kw)
-            wr = client.write_register(args.addr, value_u16, device_id=args.device_id)
-            if wr.isError():
-                raise RuntimeError(f"Write HR{args.addr} failed: {wr}")
-            print(f"Wrote HR{args.addr} = {args.set_kw:.1f} kW (device_id={args.device_id})")
-
-        if args.area == "ir":
-            rr = client.read_input_registers(args.addr, count=args.count, device_id=args.device_id)
-            area_label = "IR"
-        else:
-            rr = client.read_holding_registers(args.addr, count=args.count, device_id=args.device_id)
-            area_label = "HR"
-
-        if rr.isError():
-            raise RuntimeError(f"Read {area_label} failed: {rr}")
-
-        print(f"Read {area_label} (device_id={args.device_id}, addr={args.addr}, count={args.count}):")
-        for i, reg_u16 in enumerate(rr.registers):
-            addr = args.addr + i
-            if args.decode == "power":
-                val_str = f"{DeviceModel.decode_power_kw(reg_u16):.1f} kW"
-            elif args.decode == "soc":
-                val_str = f"{DeviceModel.decode_soc(reg_u16):.0f} %"
-            elif args.decode == "capacity":
-                val_str = f"{DeviceModel.decode_capacity_kwh(reg_u16):.1f} kWh"
-            else:
-                val_str = str(reg_u16)
-            print(f"  {area_label}{addr} = {val_str} (raw={reg_u16})")
-
-    finally:
-        client.close()
+@lru_cache(maxsize=32)
+def parse_args(argv: tuple) -> argparse.Namespace:
+    """Parse (and cache) CLI args; treat the returned namespace as read-only."""
+    ap = build_parser()
+    args = ap.parse_args(list(argv))
+    if args.server:
+        ignored = [flag for flag, used in (
+            ("--set-kw", args.set_kw is not None),
+            ("--repeat", args.repeat != 1),
+            ("--interval", args.interval != 0.0),
+            ("--decode-only", args.decode_only),
+        ) if used]
+        if ignored:
+            ap.error(f"--server cannot be combined with {', '.join(ignored)} (send write/read commands instead)")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(tuple(sys.argv[1:] if argv is None else argv))
+
+    # The client stays cached (and open) for later calls; see close_clients()
+    client = get_client(args.host, args.port)
+    if args.server:
+        serve(client, args)
+        return
+    for i in range(args.repeat):
+        if i and args.interval > 0:
+            time.sleep(args.interval)
+        run_once(client, args)
 
 
 if __name__ == "__main__":
@@ -5,6 +5,26 @@ Define a device model have:
     encode: float kW -> int16 register value -> u16 register value
     decode: u16 register value -> int16 register value -> float kW
 """
+
+
+# Module-level power codec (hot path): no classmethod dispatch, scale is a
+# multiplication by a constant and the sign fixup is branchless.
+def encode_power_kw(kw: float) -> int:
+    # Rounds half away from zero (0.25 -> 3); round() would give 2
+    raw = int(kw * 10.0 + (0.5 if kw >= 0 else -0.5))  # kW -> 0.1kW units
+    if raw < -32768 or raw > 32767:
+        raise ValueError("Power out of int16 range after scaling")
+    return raw & 0xFFFF
+
+
+def u16_to_int16(x: int) -> int:
+    return (x ^ 0x8000) - 0x8000
+
+
+def decode_power_kw(reg_u16: int) -> float:
+    return (((reg_u16 & 0xFFFF) ^ 0x8000) - 0x8000) * 0.1
+
+
 class DeviceModel:
     HR0_ADDRESS = 0
     HR1_ADDRESS = 1
@@ -15,21 +35,10 @@ class DeviceModel:
     def _int16_to_u16(x: int) -> int:
         return x & 0xFFFF
 
-    @staticmethod
-    def _u16_to_int16(x: int) -> int:
-        return x - 0x10000 if x >= 0x8000 else x
-
-    @classmethod
-    def encode_power_kw(cls, kw: float) -> int:
-        raw = int(round(kw / cls.POWER_SCALE))  # kW -> 0.1kW units
-        if raw < -32768 or raw > 32767:
-            raise ValueError("Power out of int16 range after scaling")
-        return cls._int16_to_u16(raw)
+    _u16_to_int16 = staticmethod(u16_to_int16)
 
-    @classmethod
-    def decode_power_kw(cls, reg_u16: int) -> float:
-        raw = cls._u16_to_int16(reg_u16 & 0xFFFF)
-        return raw * cls.POWER_SCALE
+    encode_power_kw = staticmethod(encode_power_kw)
+    decode_power_kw = staticmethod(decode_power_kw)
 
     # --- Unsigned scaled uint16 helpers (SOC, SOH, capacity) ---
 
@@ -54,7 +63,7 @@ class DeviceModel:
     @classmethod
     def decode_soc(cls, reg_u16: int) -> float:
         """uint16 -> SOC (%)."""
-        return cls.decode_scaled_uint16(reg_u16, scale=1.0)
+        return float(reg_u16 & 0xFFFF)
 
     @classmethod
     def encode_soh(cls, percent: float) -> int:
@@ -64,7 +73,7 @@ class DeviceModel:
     @classmethod
     def decode_soh(cls, reg_u16: int) -> float:
         """uint16 -> SOH (%)."""
-        return cls.decode_scaled_uint16(reg_u16, scale=1.0)
+        return float(reg_u16 & 0xFFFF)
 
     @classmethod
     def encode_capacity_kwh(cls, kwh: float) -> int:
@@ -74,4 +83,4 @@ class DeviceModel:
     @classmethod
     def decode_capacity_kwh(cls, reg_u16: int) -> float:
         """uint16 -> capacity (kWh)."""
-        return cls.decode_scaled_uint16(reg_u16, scale=0.1)
\ No newline at end of file
+        return (reg_u16 & 0xFFFF) * 0.1
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""
+Bulk (array) version of the DeviceModel power decoder.
+    Compiled with Numba when it is installed, otherwise plain NumPy ufuncs.
+    Same convention as device.py: 0.1 kW per LSB, int16 stored as u16.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # optional dependency
+    njit = None
+    HAVE_NUMBA = False
+
+
+if HAVE_NUMBA:
+    @njit(cache=True)
+    def decode_power_kw_arr(regs):
+        """u16 registers -> float32 kW."""
+        out = np.empty(regs.size, np.float32)
+        for i in range(regs.size):
+            r = np.int32(regs[i]) & 0xFFFF
+            out[i] = ((r ^ 0x8000) - 0x8000) * 0.1
+        return out
+
+else:
+    def decode_power_kw_arr(regs):
+        """u16 registers -> float32 kW."""
+        regs = np.asarray(regs, dtype=np.uint16)
+        return regs.astype(np.int16).astype(np.float32) * np.float32(0.1)
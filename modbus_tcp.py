@@ -3,37 +3,63 @@ from __future__ import annotations
 
 import struct
 from dataclasses import dataclass
-from typing import Optional, Tuple, List, Union
+from typing import Dict, Optional, Tuple, List, Union
 
 # Hex dump utility for debugging
-def hexdump(b: bytes) -> str:
+def hexdump(b: Union[bytes, bytearray, memoryview]) -> str:
     return b.hex(" ")
 
-# Extract a complete Modbus TCP frame from a stream buffer
-def frame_from_stream_buffer(buf: bytes) -> Tuple[Optional[bytes], bytes]:
-    if len(buf) < 6:
-        return None, buf
-    tid, pid, length = struct.unpack(">HHH", buf[:6])
+# Extract a complete Modbus TCP frame from a stream buffer.
+# Returns zero-copy views into buf: (frame or None, remaining bytes)
+def frame_from_stream_buffer(buf: Union[bytes, bytearray, memoryview]) -> Tuple[Optional[memoryview], memoryview]:
+    view = memoryview(buf)
+    if len(view) < 6:
+        return None, view
+    _tid, _pid, length = struct.unpack_from(">HHH", view, 0)
     total = 6 + length
-    if len(buf) < total:
-        return None, buf
-    return buf[:total], buf[total:]
+    if len(view) < total:
+        return None, view
+    return view[:total], view[total:]
+
+MAX_ADU_SIZE = 260  # 7-byte MBAP header + 253-byte PDU
+
+# Read exactly n bytes from a socket into buf[offset:offset+n]
+def recv_exact(sock, buf: bytearray, offset: int, n: int) -> None:
+    view = memoryview(buf)
+    end = offset + n
+    while offset < end:
+        got = sock.recv_into(view[offset:end])
+        if got == 0:
+            raise ConnectionError("socket closed while reading frame")
+        offset += got
+
+# Read one Modbus TCP frame: fixed 6-byte MBAP prefix, then `length` bytes
+def recv_frame(sock, buf: Optional[bytearray] = None) -> memoryview:
+    if buf is None:
+        buf = bytearray(MAX_ADU_SIZE)
+    recv_exact(sock, buf, 0, 6)
+    _tid, _pid, length = struct.unpack_from(">HHH", buf, 0)
+    if length < 2 or 6 + length > len(buf):
+        raise ValueError(f"invalid MBAP length {length}")
+    recv_exact(sock, buf, 6, length)
+    return memoryview(buf)[: 6 + length]
 
 # Build MBAP header and PDU
 def build_mbap(transaction_id: int, unit_id: int, pdu: bytes) -> bytes:
     length = 1 + len(pdu)
     return struct.pack(">HHH", transaction_id, 0, length) + bytes([unit_id]) + pdu
 
+# FC03/FC06 request ADU: MBAP (tid, pid=0, length=6, unit) + fc, address, word
+_REQ_STRUCT = struct.Struct(">HHHBBHH")
+
 # Build FC 03 and FC 06 requests
 # FC 03: Read Holding Registers
 def build_fc03_request(transaction_id: int, unit_id: int, address: int, count: int) -> bytes:
-    pdu = bytes([3]) + struct.pack(">H", address) + struct.pack(">H", count)
-    return build_mbap(transaction_id, unit_id, pdu)
+    return _REQ_STRUCT.pack(transaction_id, 0, 6, unit_id, 3, address, count)
 
 # FC 06: Write Single Register
 def build_fc06_request(transaction_id: int, unit_id: int, address: int, value: int) -> bytes:
-    pdu = bytes([6]) + struct.pack(">H", address) + struct.pack(">H", value & 0xFFFF)
-    return build_mbap(transaction_id, unit_id, pdu)
+    return _REQ_STRUCT.pack(transaction_id, 0, 6, unit_id, 6, address, value & 0xFFFF)
 
 
 @dataclass(frozen=True)
@@ -41,31 +67,51 @@ class ModbusResponse: # Parsed Modbus TCP response
     transaction_id: int
     unit_id: int
     function_code: int
-    data: Union[List[int], None, int]  # list for FC03, None for FC06, int for exception
+    data: Union[List[int], None, int]  # list for FC03/04, None for FC06/16, int for exception
+
+
+# Compiled ">nH" unpackers keyed by register count
+_REGS_STRUCTS: Dict[int, struct.Struct] = {}
+
+def _regs_struct(n: int) -> struct.Struct:
+    st = _REGS_STRUCTS.get(n)
+    if st is None:
+        st = _REGS_STRUCTS[n] = struct.Struct(f">{n}H")
+    return st
+
+
+# Per-function-code parsers; frame is the full ADU, PDU starts at offset 7
+def _parse_registers(tid: int, unit_id: int, fc: int, frame) -> ModbusResponse:
+    byte_count = frame[8]
+    if len(frame) < 9 + byte_count:
+        raise ValueError("truncated register data")
+    regs = list(_regs_struct(byte_count >> 1).unpack_from(frame, 9))
+    return ModbusResponse(tid, unit_id, fc, regs)
+
+def _parse_no_data(tid: int, unit_id: int, fc: int, frame) -> ModbusResponse:
+    return ModbusResponse(tid, unit_id, fc, None)
+
+_FC_PARSERS = {
+    3: _parse_registers,   # Read Holding Registers
+    4: _parse_registers,   # Read Input Registers
+    6: _parse_no_data,     # Write Single Register (echo)
+    16: _parse_no_data,    # Write Multiple Registers (echo)
+}
 
 
-def parse_response(frame: bytes) -> ModbusResponse:
+def parse_response(frame: Union[bytes, bytearray, memoryview]) -> ModbusResponse:
     if len(frame) < 8:
         raise ValueError("frame too short")
 
-    tid, pid, length = struct.unpack(">HHH", frame[:6])
+    tid, pid, _length = struct.unpack_from(">HHH", frame, 0)
     unit_id = frame[6]
-    pdu = frame[7:]
 
     if pid != 0:
         raise ValueError("protocol id must be 0")
 
-    fc = pdu[0]
+    fc = frame[7]
     if fc & 0x80:
-        return ModbusResponse(tid, unit_id, fc, pdu[1])
+        return ModbusResponse(tid, unit_id, fc, frame[8])
 
-    if fc == 3:
-        byte_count = pdu[1]
-        data_bytes = pdu[2 : 2 + byte_count]
-        regs = [struct.unpack(">H", data_bytes[i : i + 2])[0] for i in range(0, len(data_bytes), 2)]
-        return ModbusResponse(tid, unit_id, fc, regs)
-
-    if fc == 6:
-        return ModbusResponse(tid, unit_id, fc, None)
-
-    return ModbusResponse(tid, unit_id, fc, None)
+    handler = _FC_PARSERS.get(fc, _parse_no_data)
+    return handler(tid, unit_id, fc, frame)
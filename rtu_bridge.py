@@ -6,10 +6,21 @@ import logging
 import struct
 import threading
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from datetime import datetime
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 
 import serial
 
+from device import decode_power_kw
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:  # optional: faster JSON encoding for /api/multimeter
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s | RTU-BRIDGE | %(levelname)s | %(message)s",
@@ -17,41 +28,54 @@ logging.basicConfig(
 log = logging.getLogger("rtu_bridge")
 
 
-def _u16_to_int16(x: int) -> int:
-    return x - 0x10000 if x >= 0x8000 else x
+def _crc16_table() -> list[int]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+        table.append(crc)
+    return table
 
 
-def decode_power_kw(reg_u16: int) -> float:
-    return _u16_to_int16(reg_u16) * 0.1
+_CRC16_TABLE = _crc16_table()
 
 
 def _crc16(data: bytes) -> int:
-    """Calculate Modbus CRC16."""
+    """Calculate Modbus CRC16 (table-driven, one lookup per byte)."""
     crc = 0xFFFF
+    table = _CRC16_TABLE
     for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 1:
-                crc = (crc >> 1) ^ 0xA001
-            else:
-                crc >>= 1
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
     return crc
 
 
-def _rtu_read_input_registers(ser: serial.Serial, slave_id: int, start: int, count: int) -> int | None:
-    """Send FC04 request and return register value (or None on error)."""
+@lru_cache(maxsize=64)
+def _fc04_request(slave_id: int, start: int, count: int) -> bytes:
+    """Build (and cache) the FC04 RTU request frame for a read span."""
     # Build request: slave, FC04, start_hi, start_lo, count_hi, count_lo
     request = struct.pack(">BBHH", slave_id, 0x04, start, count)
-    crc = _crc16(request)
-    request += struct.pack("<H", crc)  # CRC is little-endian
-    
+    return request + struct.pack("<H", _crc16(request))  # CRC is little-endian
+
+
+def _rtu_read_input_registers(ser: serial.Serial, slave_id: int, start: int, count: int) -> tuple[int, ...]:
+    """Send FC04 request and return the register values (raises on error)."""
+    request = _fc04_request(slave_id, start, count)
+
     ser.reset_input_buffer()
     ser.write(request)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("[SEND] bytes=%d hex=%s", len(request), request.hex(" "))
     
     # Expected response: slave, FC04, byte_count, data..., CRC (2 bytes)
     # For 1 register: 1+1+1+2+2 = 7 bytes
     expected_len = 3 + (count * 2) + 2
     response = ser.read(expected_len)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("[RECV] bytes=%d hex=%s", len(response), response.hex(" "))
     
     if len(response) < expected_len:
         raise ValueError(f"Short response: got {len(response)} bytes, expected {expected_len}")
@@ -68,16 +92,82 @@ def _rtu_read_input_registers(ser: serial.Serial, slave_id: int, start: int, cou
     
     # Parse data (big-endian)
     data_bytes = response[3:-2]
-    values = struct.unpack(f">{count}H", data_bytes)
-    return values[0] if count == 1 else values
+    return struct.unpack(f">{count}H", data_bytes)
+
+
+MAX_READ_COUNT = 125  # Modbus limit for one FC03/FC04 request
+
+
+def _parse_reg_ranges(spec: str) -> list[tuple[int, int]]:
+    """Parse "start:count,..." and merge adjacent ranges into FC04 read spans."""
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start_s, _, count_s = part.partition(":")
+        start, count = int(start_s), int(count_s or 1)
+        if start < 0 or count < 1 or start + count > 0x10000:
+            raise ValueError(f"Invalid register range: {part!r}")
+        ranges.append((start, count))
+    if not ranges:
+        raise ValueError("No register ranges given")
+
+    plan: list[tuple[int, int]] = []
+    for start, count in sorted(ranges):
+        end = start + count
+        if plan:
+            prev_start, prev_count = plan[-1]
+            prev_end = prev_start + prev_count
+            if end <= prev_end:
+                continue
+            if start <= prev_end and end - prev_start <= MAX_READ_COUNT:
+                plan[-1] = (prev_start, end - prev_start)
+                continue
+            start = max(start, prev_end)
+        while end - start > MAX_READ_COUNT:
+            plan.append((start, MAX_READ_COUNT))
+            start += MAX_READ_COUNT
+        plan.append((start, end - start))
+    return plan
 
 
 _snapshot_lock = threading.Lock()
 _snapshot: dict = {
     "active_power_kw": None,
     "raw": None,
-    "comm": {"ok": False, "last_ok_ts": None, "last_error": "not polled yet"},
+    "registers": {},
+    "comm": {"ok": False, "last_ok_ts_epoch": None, "last_error": "not polled yet"},
 }
+# JSON encoding of _snapshot; None means stale, rebuilt on the next GET
+_snapshot_bytes: bytes | None = None
+# Bumped on every snapshot change so a slow encode cannot cache stale data
+_snapshot_version = 0
+
+
+def _snapshot_payload() -> bytes:
+    """Return the cached JSON payload, encoding it outside the lock if stale."""
+    global _snapshot_bytes
+    with _snapshot_lock:
+        if _snapshot_bytes is not None:
+            return _snapshot_bytes
+        version = _snapshot_version
+        data = dict(_snapshot)
+        data["registers"] = dict(_snapshot["registers"])
+        comm = dict(_snapshot["comm"])
+
+    epoch = comm["last_ok_ts_epoch"]
+    data["comm"] = {
+        "ok": comm["ok"],
+        "last_ok_ts": datetime.fromtimestamp(epoch).isoformat(timespec="seconds") if epoch else None,
+        "last_error": comm["last_error"],
+    }
+    body = _dumps(data)
+
+    with _snapshot_lock:
+        if _snapshot_version == version:
+            _snapshot_bytes = body
+    return body
 
 
 def _poller(
@@ -86,56 +176,99 @@ def _poller(
     baudrate: int,
     interval_s: float,
     stop_event: threading.Event,
+    reg_plan: list[tuple[int, int]] | None = None,
 ) -> None:
-    global _snapshot
-    log.info(f"RTU poller started: {com_port} slave={slave_id} baud={baudrate}")
-
-    while not stop_event.is_set():
-        try:
-            # Use deferred open pattern for com0com compatibility
-            ser = serial.Serial()
-            ser.port = com_port
-            ser.baudrate = baudrate
-            ser.bytesize = 8
-            ser.parity = "N"
-            ser.stopbits = 1
-            ser.timeout = 2
-            ser.open()
-            
-            raw = _rtu_read_input_registers(ser, slave_id, start=0, count=1)
-            ser.close()
-
-            kw = round(decode_power_kw(raw), 1)
-            ts = time.strftime("%Y-%m-%dT%H:%M:%S")
-            with _snapshot_lock:
-                _snapshot = {
-                    "active_power_kw": kw,
-                    "raw": raw,
-                    "comm": {"ok": True, "last_ok_ts": ts, "last_error": None},
-                }
-            log.info(f"[OK] raw=0x{raw:04X} => {kw:+.1f} kW")
-        except Exception as exc:
-            with _snapshot_lock:
-                _snapshot["comm"]["ok"] = False
-                _snapshot["comm"]["last_error"] = str(exc)
-            log.warning(f"RTU poll error: {exc}")
-
-        stop_event.wait(interval_s)
+    """Poll one slave on one serial port from a plain background thread.
+
+    Synchronous on purpose: Modbus RTU is half-duplex, so only one request
+    can be outstanding on the bus and an asyncio poller would gain nothing.
+    """
+    global _snapshot_bytes, _snapshot_version
+    if reg_plan is None:
+        reg_plan = [(0, 1)]
+    # Register names per span, built once so polls only store values
+    span_names = [[f"IR{start + i}" for i in range(count)] for start, count in reg_plan]
+    # Active power lives in IR0; the plan is sorted, so if polled it is span 0, offset 0
+    has_power = reg_plan[0][0] == 0
+    log.info(f"RTU poller started: {com_port} slave={slave_id} baud={baudrate} plan={reg_plan}")
+
+    # Use deferred open pattern for com0com compatibility
+    ser = serial.Serial()
+    ser.port = com_port
+    ser.baudrate = baudrate
+    ser.bytesize = 8
+    ser.parity = "N"
+    ser.stopbits = 1
+    ser.timeout = 2
+
+    try:
+        while not stop_event.is_set():
+            try:
+                # Keep the port open across polls; reopen only after a failure
+                if not ser.is_open:
+                    ser.open()
+
+                # One FC04 transaction per contiguous span
+                span_values = [
+                    _rtu_read_input_registers(ser, slave_id, start=start, count=count)
+                    for start, count in reg_plan
+                ]
+
+                if has_power:
+                    raw = span_values[0][0]
+                    kw = round(decode_power_kw(raw), 1)
+                else:
+                    raw = kw = None
+                ts = time.time()
+                # Update the existing snapshot in place instead of rebuilding it
+                with _snapshot_lock:
+                    _snapshot["active_power_kw"] = kw
+                    _snapshot["raw"] = raw
+                    registers = _snapshot["registers"]
+                    for names, values in zip(span_names, span_values):
+                        registers.update(zip(names, values))
+                    comm = _snapshot["comm"]
+                    comm["ok"] = True
+                    comm["last_ok_ts_epoch"] = ts
+                    comm["last_error"] = None
+                    _snapshot_bytes = None
+                    _snapshot_version += 1
+                if raw is not None:
+                    log.info("[OK] raw=0x%04X => %+.1f kW", raw, kw)
+                else:
+                    log.info("[OK] polled %d span(s)", len(reg_plan))
+            except Exception as exc:
+                ser.close()
+                with _snapshot_lock:
+                    _snapshot["comm"]["ok"] = False
+                    _snapshot["comm"]["last_error"] = str(exc)
+                    _snapshot_bytes = None
+                    _snapshot_version += 1
+                log.warning("RTU poll error: %s", exc)
+
+            stop_event.wait(interval_s)
+    finally:
+        ser.close()
+        log.info("RTU poller stopped")
 
 
 class BridgeHandler(BaseHTTPRequestHandler):
+    # Keep-alive: every response sends Content-Length so clients can reuse the socket
+    protocol_version = "HTTP/1.1"
+    timeout = 30  # drop idle keep-alive connections
 
     def do_GET(self):
         if self.path == "/api/multimeter":
-            with _snapshot_lock:
-                data = dict(_snapshot)
+            body = _snapshot_payload()
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
-            self.wfile.write(json.dumps(data).encode())
+            self.wfile.write(body)
         else:
             self.send_response(404)
+            self.send_header("Content-Length", "0")
             self.end_headers()
 
     def log_message(self, fmt, *args):
@@ -151,20 +284,28 @@ def main() -> None:
     parser.add_argument("--rtu-baud", type=int, default=9600)
     parser.add_argument("--http-port", type=int, default=8081)
     parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--regs", default="0:1",
+                        help='Input registers to poll as "start:count,..." (e.g. "0:5,10:2"); '
+                             'active power is decoded from IR0 when it is included')
     args = parser.parse_args()
 
+    try:
+        reg_plan = _parse_reg_ranges(args.regs)
+    except ValueError as exc:
+        parser.error(f"--regs: {exc}")
+
     # Start RTU poller in background thread
     stop_event = threading.Event()
     poller = threading.Thread(
         target=_poller,
         args=(args.rtu_com, args.rtu_slave, args.rtu_baud,
-              args.poll_interval, stop_event),
+              args.poll_interval, stop_event, reg_plan),
         daemon=True,
     )
     poller.start()
 
     # Start HTTP server (blocking)
-    server = HTTPServer(("0.0.0.0", args.http_port), BridgeHandler)
+    server = ThreadingHTTPServer(("0.0.0.0", args.http_port), BridgeHandler)
     log.info(f"RTU Bridge HTTP: http://localhost:{args.http_port}/api/multimeter")
     log.info(f"RTU client: {args.rtu_com} slave={args.rtu_slave} baud={args.rtu_baud}")
 
@@ -174,6 +315,7 @@ def main() -> None:
         log.info("Shutting down")
         stop_event.set()
         server.shutdown()
+        poller.join(timeout=args.poll_interval + 3)
 
 
 if __name__ == "__main__":
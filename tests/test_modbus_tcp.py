@@ -0,0 +1,58 @@
+import socket
+import struct
+import threading
+import time
+import unittest
+
+from modbus_tcp import MAX_ADU_SIZE, parse_response, recv_frame
+
+# FC03 response: tid=1, unit=1, 3 registers (1, 255, 0x8000)
+FC03_FRAME = bytes.fromhex("000100000009010306000100ff8000")
+
+
+class RecvFrameTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tx, self.rx = socket.socketpair()
+        self.rx.settimeout(2)
+
+    def tearDown(self):
+        self.tx.close()
+        self.rx.close()
+
+    def _send_later(self, *chunks):
+        def run():
+            for chunk in chunks:
+                time.sleep(0.02)
+                self.tx.sendall(chunk)
+        t = threading.Thread(target=run)
+        t.start()
+        self.addCleanup(t.join)
+
+    def test_reads_frame_split_inside_header_and_pdu(self):
+        self._send_later(FC03_FRAME[:3], FC03_FRAME[3:8], FC03_FRAME[8:])
+        frame = recv_frame(self.rx)
+        self.assertEqual(bytes(frame), FC03_FRAME)
+        self.assertEqual(parse_response(frame).data, [1, 255, 0x8000])
+
+    def test_back_to_back_frames_reuse_buffer(self):
+        self.tx.sendall(FC03_FRAME + FC03_FRAME)
+        buf = bytearray(MAX_ADU_SIZE)
+        for _ in range(2):
+            self.assertEqual(bytes(recv_frame(self.rx, buf)), FC03_FRAME)
+
+    def test_peer_close_mid_frame_raises_connection_error(self):
+        self.tx.sendall(FC03_FRAME[:10])
+        self.tx.close()
+        with self.assertRaises(ConnectionError):
+            recv_frame(self.rx)
+
+    def test_invalid_mbap_length_raises_value_error(self):
+        for length in (0, 1, MAX_ADU_SIZE):
+            self.tx.sendall(struct.pack(">HHH", 1, 0, length))
+            with self.assertRaises(ValueError):
+                recv_frame(self.rx)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+try:
+    from rtu_bridge import MAX_READ_COUNT, _crc16, _fc04_request, _parse_reg_ranges
+except ImportError as exc:  # rtu_bridge needs pyserial
+    raise unittest.SkipTest(f"rtu_bridge not importable: {exc}")
+
+
+class ParseRegRangesTest(unittest.TestCase):
+
+    def test_single_and_default_count(self):
+        self.assertEqual(_parse_reg_ranges("0:1"), [(0, 1)])
+        self.assertEqual(_parse_reg_ranges(" 7 "), [(7, 1)])
+
+    def test_separate_ranges_stay_separate_and_sorted(self):
+        self.assertEqual(_parse_reg_ranges("10:2,0:5"), [(0, 5), (10, 2)])
+
+    def test_adjacent_and_overlapping_ranges_merge(self):
+        self.assertEqual(_parse_reg_ranges("0:5,5:3"), [(0, 8)])
+        self.assertEqual(_parse_reg_ranges("10:2,0:5,3:4"), [(0, 7), (10, 2)])
+
+    def test_contained_range_is_dropped(self):
+        self.assertEqual(_parse_reg_ranges("0:10,2:3"), [(0, 10)])
+
+    def test_merge_is_capped_at_max_read_count(self):
+        self.assertEqual(_parse_reg_ranges("0:100,50:100"), [(0, 100), (100, 50)])
+        self.assertEqual(_parse_reg_ranges("0:200,190:20"), [(0, 125), (125, 85)])
+
+    def test_long_range_is_split(self):
+        self.assertEqual(_parse_reg_ranges("0:300"), [(0, 125), (125, 125), (250, 50)])
+        self.assertTrue(all(count <= MAX_READ_COUNT for _, count in _parse_reg_ranges("0:1000")))
+
+    def test_invalid_specs_raise_value_error(self):
+        for spec in ("1:0", "-1:2", "65535:2", "", " , ", "a:1"):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                _parse_reg_ranges(spec)
+
+
+class Crc16Test(unittest.TestCase):
+
+    def test_fc04_request_frame(self):
+        self.assertEqual(_fc04_request(10, 0, 1), bytes.fromhex("0a040000000130b1"))
+
+    def test_crc_of_frame_with_crc_is_zero(self):
+        self.assertEqual(_crc16(_fc04_request(1, 0x1234, 10)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()